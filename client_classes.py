@@ -3,12 +3,32 @@ class Client:
     Root class for Client objects.
     Defines what variables should be used for comparing clients from different sources.
     """
+    __slots__ = ("name",)           # Fixed attributes: smaller instances and faster attribute access than __dict__
     comparison_variables = ["name"]
 
+    @staticmethod
+    def normalize(value) -> str:
+        """Normalize a value for comparison: case and surrounding whitespace are ignored."""
+        return str(value).strip().casefold()
+
     def __eq__(self, other):
-        matching_fields = [str(self.__getattribute__(variable)).lower() == str(other.__getattribute__(variable)).lower()
-                           for variable in self.comparison_variables]
-        return all(matching_fields)
+        if not isinstance(other, Client):
+            return NotImplemented
+        return self.comparison_key() == other.comparison_key()
+
+    def __hash__(self):
+        """Hash from the same values that are used for comparison, so that Clients can be looked up from sets."""
+        return hash(self.comparison_key())
+
+    def comparison_key(self, comparison_variables: list[str] = None) -> tuple[str]:
+        """
+        Normalized values of the comparison variables.
+        Clients with equal keys are considered equal, so keys can be used for set / dict lookups.
+        :param comparison_variables: Variables to compare by. Defaults to the class comparison_variables.
+        :return: A tuple with a normalized value for each comparison variable
+        """
+        comparison_variables = comparison_variables or self.comparison_variables
+        return tuple(self.normalize(getattr(self, variable)) for variable in comparison_variables)
 
 
 class NsightClient(Client):
@@ -17,12 +37,13 @@ class NsightClient(Client):
     Initiates from N-sight API Client xml.
     Can output json payload for Halo Client post request.
     """
-    toplevel_id = ""
+    __slots__ = ("nsight_id", "toplevel_id")
     halo_colour = "#a75ded"         # N-able purple to quickly distinguish Clients synced from N-sight
 
     def __init__(self, client: dict):
         self.nsight_id = client["nsight_id"]
         self.name = client["name"]
+        self.toplevel_id = ""       # Set later, if N-sight clients toplevel is supplied
 
     def __repr__(self):
         return f"{self.name} (N-sight id: {self.nsight_id})"
@@ -40,6 +61,8 @@ class HaloClient(Client):
     Class for Halo client objects.
     Initiates from Halo API Client json.
     """
+    __slots__ = ("halo_id", "toplevel_id")
+
     def __init__(self, client: dict):
         self.halo_id = client["id"]
         self.name = client["name"]
@@ -54,6 +77,8 @@ class HaloToplevel(Client):
     Class for Halo toplevel objects. (One level above Clients.)
     Initiates from Halo API Toplevel json.
     """
+    __slots__ = ("toplevel_id",)
+
     def __init__(self, toplevel: dict):
         self.toplevel_id = toplevel["id"]
         self.name = toplevel["name"]
@@ -0,0 +1,35 @@
+# standard
+import functools
+import types
+# local
+import general
+
+
+ini_file_path = ".ini"
+env_file_path = ".env"
+
+
+@functools.cache
+def get_ini_parameters(path: str = ini_file_path) -> types.MappingProxyType:
+    """
+    Parse config parameters from .ini file.
+    File is only parsed on the first call, subsequent calls return the cached result.
+    :param path: Path to .ini file
+    :return: A read-only dict of parsed parameters
+    """
+    return types.MappingProxyType(general.parse_input_file(path))
+
+
+@functools.cache
+def load_env_variables(path: str = env_file_path) -> types.MappingProxyType:
+    """
+    Parse variables from .env file and set them to environment.
+    File is only parsed on the first call, subsequent calls return the cached result.
+    :param path: Path to .env file
+    :return: A read-only dict of the variables (as strings)
+    """
+    env_variables = general.parse_input_file(
+        path,
+        parse_values=False,
+        set_environmental_variables=True)
+    return types.MappingProxyType(env_variables)
@@ -2,21 +2,30 @@
 # standard
 import functools
 import json
+import logging
 import os
 import random
-import re
-from time import sleep
+import secrets
+from time import monotonic, sleep
 # local
 import logstring
 
 
-def retry_function(function=None, *, n_retries: int = 3, interval_sec: float = 3.0,
-                   exceptions: (Exception, tuple[Exception]) = Exception, fatal_fail=True):
+request_timeout = (5, 30)       # Seconds to wait for (connecting, response data) in API requests
+
+
+def retry_function(function=None, *, n_retries: int = 3, interval_sec: float = 3.0, max_interval_sec: float = 30.0,
+                   max_total_sec: float = None, exceptions: (Exception, tuple[Exception]) = Exception,
+                   fatal_fail=True):
     """
     Decorator. Retries the wrapped function.
+    Waits interval_sec before the first retry. Later waits grow exponentially with random jitter
+    (decorrelated jitter), so that callers failing at the same time don't retry in lockstep.
     :param function: Wrapped function
     :param n_retries: How many n_retries to retry
-    :param interval_sec: Time between retries
+    :param interval_sec: Time before the first retry and minimum time between retries
+    :param max_interval_sec: Maximum time between retries
+    :param max_total_sec: Time budget for all attempts. No retry is started if its wait would exceed the budget.
     :param exceptions: Define exceptions that trigger a retry attempt (default: Exception, i.e. all)
     :param fatal_fail: Re-raise last exception after all retry attempts fail.
     :return: Function result or None, if it fails
@@ -26,37 +35,45 @@ def retry_function(function=None, *, n_retries: int = 3, interval_sec: float = 3
             retry_function,
             n_retries=n_retries,
             interval_sec=interval_sec,
+            max_interval_sec=max_interval_sec,
+            max_total_sec=max_total_sec,
             exceptions=exceptions,
             fatal_fail=fatal_fail)
 
     @functools.wraps(function)
     def retry(*args, **kwargs):
+        deadline = None if max_total_sec is None else monotonic() + max_total_sec     # Monotonic: immune to clock jumps
+        delay_sec = interval_sec
         attempt = 1
-        while attempt <= n_retries:
+        while True:
             try:
                 response = function(*args, **kwargs)
             except exceptions as exception:
-                if attempt < n_retries:
-                    log_entry = logstring.RetryAttempt(
-                        function=function,
-                        exception=exception,
-                        n_retries=n_retries,
-                        interval_sec=interval_sec,
-                        attempt=attempt)
-                    log_entry.record("DEBUG")
+                out_of_time = deadline is not None and monotonic() + delay_sec > deadline
+                if attempt < n_retries and not out_of_time:
+                    if logstring.get_logger().isEnabledFor(logging.DEBUG):     # Skip building unused message
+                        log_entry = logstring.RetryAttempt(
+                            function=function,
+                            exception=exception,
+                            n_retries=n_retries,
+                            interval_sec=delay_sec,
+                            attempt=attempt)
+                        log_entry.record("DEBUG")
 
                     attempt += 1
-                    sleep(interval_sec)
+                    sleep(delay_sec)
+                    if delay_sec:       # Zero interval retries immediately, without backoff
+                        delay_sec = min(max_interval_sec, random.uniform(interval_sec, delay_sec * 3))
                 else:
                     log_entry = logstring.RetryFailed(
                         function=function,
                         exception=exception,
-                        n_retries=n_retries)
+                        n_retries=attempt)
                     log_entry.record("WARNING")
 
-                    attempt += 1
                     if fatal_fail:
                         raise exception
+                    return
             else:
                 if attempt > 1:
                     logstring.LogString("Retry successful!", context=function.__name__).record("INFO")
@@ -64,27 +81,34 @@ def retry_function(function=None, *, n_retries: int = 3, interval_sec: float = 3
     return retry
 
 
+# Characters that a json value can start with: object, array, string, number, true, false, null
+# and NaN / Infinity, which the json module also accepts
+json_first_characters = frozenset('{["-0123456789tfnNI')
+
+
 def parse_input_file_line(line: str, parse_value: bool = True) -> (str, (dict | list | str)):
     """
     Parse line from input file.
     Returns None, if it's a comment line (starting with #).
     Tries to parse value: dict if value is json, list if it's values separated by commas, string otherwise.
-    :param line: Line from readlines
+    :param line: Line from input file
     :param parse_value: True/False whether values should be automatically parsed
     :return: None if comment line,
     else variable name + dict if json, list if comma separated values, string if single value.
     """
-    if re.search(r"^\s*#", line) or not re.search(r"=", line):
+    if line.lstrip().startswith("#") or "=" not in line:
         return
-    else:
-        name = line.split("=")[0].strip()
-        value = line.split("=")[1].strip()
+    name, _, value = line.partition("=")        # Split on first "=" only, values may contain "=" too
+    name = name.strip()
+    value = value.strip()
     if parse_value:
-        try:
-            value = json.loads(value)
-        except json.decoder.JSONDecodeError:
-            value = [list_item.strip() for list_item in value.split(",")]
-            value = value[0] if len(value) == 1 else value      # return str if only a single value, else list
+        if value[:1] in json_first_characters:      # Only attempt json parsing if value can be json
+            try:
+                return name, json.loads(value)
+            except json.decoder.JSONDecodeError:
+                pass
+        value = [list_item.strip() for list_item in value.split(",")]
+        value = value[0] if len(value) == 1 else value      # return str if only a single value, else list
     return name, value
 
 
@@ -98,26 +122,20 @@ def parse_input_file(path: str, parse_values: bool = True,
     :param set_environmental_variables: True/False - set imported variables directly to environment without returning.
     :return: A dict on imported values or None, if set straight to environmental variables.
     """
-    parsed_values = dict()
-    with open(path) as input_file:
-        for line in input_file.readlines():
-            parsed_line = parse_input_file_line(line, parse_values)
-            if parsed_line is not None:
-                parsed_values[parsed_line[0]] = parsed_line[1]
+    with open(path) as input_file:        # Lines are read lazily from the file object
+        parsed_lines = (parse_input_file_line(line, parse_values) for line in input_file)
+        parsed_values = dict(parsed_line for parsed_line in parsed_lines if parsed_line is not None)
     if set_environmental_variables:
-        # Make sure values are strings (env variables only accept strings)
-        env_variables = {key: str(value) for key, value in parsed_values.items()}
-        os.environ.update(**env_variables)
+        for key, value in parsed_values.items():
+            os.environ[key] = str(value)        # Env variables only accept strings
     return parsed_values
 
 
 def generate_random_hex(length: int) -> str:
     """
     Generate random hexadecimal string with given length.
-    Alternative: f"{16 ** 8 - 1:08x}"). Has limited length, because of maximum int size.
+    Each random byte gives two hex characters, so an extra byte is generated for odd lengths and the string trimmed.
     :param length: Length of the hex string.
     :return: A string representation of a hex with the requested length
     """
-    decimals = random.choices(range(16), k=length)
-    hexadecimal = "".join(["{:x}".format(decimal) for decimal in decimals])
-    return hexadecimal
+    return secrets.token_hex((length + 1) // 2)[:length]
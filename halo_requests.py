@@ -1,36 +1,82 @@
-import json
 # standard
+from collections.abc import Iterator
+import json
+import random
 import re
 # external
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 import responses as mock_responses
+from urllib3.util import Retry
 # local
 import general
 import logstring
 
 
+class HaloResponseError(ConnectionError):
+    """
+    Halo API replied with an unsuccessful status code.
+    Keeps the response, so that callers can tell rejected requests (4xx) from ones with an unknown outcome (5xx).
+    """
+    def __init__(self, log_entry: logstring.LogString, response: requests.Response):
+        super().__init__(log_entry)
+        self.response = response
+
+
 class HaloSession(requests.Session):
-    """A session object that includes the Halo authorization header."""
+    """
+    A session object that includes the Halo authorization header.
+    Connections are kept alive and pooled, so that consecutive and concurrent requests reuse them.
+    """
+    pool_connections = 8            # Number of hosts to keep connection pools for
+    pool_maxsize = 32               # Max connections kept open per host
+
     def __init__(self, token: str):
         super().__init__()
         headers = {"Authorization": f"Bearer {token}"}
         self.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+
+class JitteredRetry(Retry):
+    """
+    urllib3 Retry policy that adds random jitter to the exponential backoff,
+    so that clients failing at the same time don't retry in lockstep.
+    """
+    jitter_ratio = 0.5          # Up to this share of the backoff time is randomly added to it
+
+    def get_backoff_time(self) -> float:
+        return super().get_backoff_time() * (1 + random.random() * self.jitter_ratio)
 
 
 class HaloAuthorizer:
-    """Interface to get authorization tokens for Halo API requests with different scopes."""
+    """
+    Interface to get authorization tokens for Halo API requests with different scopes.
+    Transient failures (connection errors, 429 and 5xx responses) are retried by urllib3 with jittered backoff.
+    """
     grant_type = "client_credentials"
+    retry_policy = JitteredRetry(
+        total=3,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset(["POST"]),
+        raise_on_status=False)          # Return the last bad response instead of raising, so it can be logged
 
     def __init__(self, url: str, tenant: str, client_id: str, secret: str):
         self.url = url
         self.tenant = tenant
         self.client_id = client_id
         self.secret = secret
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(max_retries=self.retry_policy))
 
-    @general.retry_function(fatal_fail=True)
     def get_token(self, scope: str) -> dict[str]:
         """
-        Get authorization token for the requested scope
+        Get authorization token for the requested scope.
+        Raises ConnectionError if the request still fails after retries.
         :param scope: Desired scope of authorization. Usually in the form of read:endpoint or edit:endpoint.
         :return: A dict in the form: {"token_type": "Bearer", "access_token": TOKENSTRING123123"}
         """
@@ -43,19 +89,20 @@ class HaloAuthorizer:
             "client_secret": self.secret,
             "scope": scope}
 
-        response = requests.post(
+        response = self.session.post(
             url=self.url,
             data=authentication_body,
-            params=parameters)
+            params=parameters,
+            timeout=general.request_timeout)
 
-        if not response.ok:         # Raise error to trigger retry
+        if not response.ok:
             log_entry = logstring.BadResponse(
                 method="POST",
                 url=self.url,
                 response=response,
                 context="HaloAuthorizer.get_token")
             raise ConnectionError(log_entry)
-        return response.json()
+        return orjson.loads(response.content)
 
 
 class HaloInterface:
@@ -67,14 +114,16 @@ class HaloInterface:
     pagination_page_size = 50                                             # Parameters per page to get in pagination
     record_count_parameter = "record_count"                   # Parameter name for record count in Halo API response
     record_count_pattern = re.compile(rf"\"{record_count_parameter}\":\s*(\d+)")    # Regex pattern for record count
+    unsent_request_exceptions = (requests.ConnectTimeout,)    # Request never reached Halo, safe to repeat any method
 
-    def __init__(self, url, endpoint: str, dryrun=False, fatal_fail=True):
-        self.endpoint_url = url.strip("/") + "/" + endpoint
+    def __init__(self, url, endpoint: str, dryrun=False, fatal_fail=True,
+                 retry_exceptions: (Exception, tuple[Exception]) = Exception):
+        self.endpoint_url = f"{url.rstrip('/')}/{endpoint.strip('/')}"      # Exactly one slash between url and endpoint
         self.dryrun = dryrun
         if dryrun:      # Replace post with mock function
             self.post = self.mock_post
         # Initialize request with @retry_function decorator
-        self._request = general.retry_function(self._request, fatal_fail=fatal_fail)
+        self._request = general.retry_function(self._request, fatal_fail=fatal_fail, exceptions=retry_exceptions)
 
     def update_retry_policy(self, **kwargs):
         """
@@ -101,7 +150,8 @@ class HaloInterface:
             method=method,
             url=self.endpoint_url,
             params=params,
-            json=json)
+            json=json,
+            timeout=general.request_timeout)
 
         if not response.ok:             # If request is unsuccessful, raise error to trigger a retry
             log_entry = logstring.BadResponse(
@@ -109,7 +159,7 @@ class HaloInterface:
                 url=self.endpoint_url,
                 response=response,
                 context="HaloInterface.request")
-            raise ConnectionError(log_entry)
+            raise HaloResponseError(log_entry, response)
         return response
 
     def get(self, session: HaloSession, parameters: dict) -> list[requests.Response]:
@@ -119,13 +169,21 @@ class HaloInterface:
         :param parameters: Get request parameters
         :return: List of responses from paginated replies
         """
+        return list(self.iter_pages(session, parameters))
+
+    def iter_pages(self, session: HaloSession, parameters: dict) -> Iterator[requests.Response]:
+        """
+        Wrapper for self.request. Does a GET request with pagination handled.
+        Pages are yielded as they are received, so they can be processed before the next one is requested.
+        :param session: HaloSession object
+        :param parameters: Get request parameters
+        :return: Generator of responses from paginated replies
+        """
         parameters.update(
             pageinate=True,
             page_size=self.pagination_page_size,
             page_no=1)
 
-        # Return a list of pages from paginated responses
-        responses = list()
         while True:
             response = self._request(
                 session=session,
@@ -136,8 +194,7 @@ class HaloInterface:
             if not int(self.record_count_pattern.findall(response.text)[0]):
                 break
             parameters["page_no"] += 1
-            responses += [response]
-        return responses
+            yield response
 
     def post(self, session: HaloSession, json: (list, dict) = None) -> requests.Response | None:
         """
@@ -152,9 +209,10 @@ class HaloInterface:
             json=json)
         return response
 
-    def mock_post(self, *args, **kwargs) -> requests.Response:
+    def mock_post(self, *args, session: HaloSession = None, **kwargs) -> requests.Response:
         """
         Mock post response generator. Used as replacement for editing actions in dryrun mode
+        :param session: Accepted for compatibility with self.post, not used or included in the response
         :return: Mock response with input parameters and status 201
         """
         response_json = {
@@ -183,8 +241,11 @@ def parse_clients(clients_response: list[requests.Response]) -> list[dict]:
     client_data_field = "clients"
     clients = list()
     for page in clients_response:
-        client_data = page.json()[client_data_field]
-        clients += client_data if isinstance(client_data, list) else [client_data]
+        client_data = orjson.loads(page.content)[client_data_field]
+        if isinstance(client_data, list):
+            clients.extend(client_data)
+        else:
+            clients.append(client_data)
     return clients
 
 
@@ -197,7 +258,10 @@ def parse_toplevels(toplevels_response: list[requests.Response]) -> list[dict]:
     toplevels_data_field = "tree"
     toplevels = list()
     for page in toplevels_response:
-        toplevel_data = page.json()[toplevels_data_field]
-        toplevels += toplevel_data if isinstance(toplevel_data, list) else [toplevel_data]
+        toplevel_data = orjson.loads(page.content)[toplevels_data_field]
+        if isinstance(toplevel_data, list):
+            toplevels.extend(toplevel_data)
+        else:
+            toplevels.append(toplevel_data)
 
     return toplevels
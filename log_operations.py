@@ -82,7 +82,7 @@ class Redactor(logging.Filter):
         return " | ".join(pattern.pattern for pattern in self.patterns)
 
     def add_pattern(self, pattern: re.Pattern):
-        self.patterns += [pattern]
+        self.patterns.append(pattern)
 
     def filter(self, record: logging.LogRecord) -> bool:
         """
@@ -5,6 +5,15 @@ import requests
 import sqlite3
 
 
+def get_logger(logger_name: str = None) -> logging.Logger:
+    """
+    Get the logger that log strings are recorded to.
+    :param logger_name: Name of logger. Defaults to LOGGER_NAME env variable or root logger.
+    :return: logging.Logger object
+    """
+    return logging.getLogger(logger_name or os.getenv("LOGGER_NAME", "root"))
+
+
 class LogString:
     """
     Parent class for log entries. Stores short and full versions of the log message and the logger to use.
@@ -20,8 +29,7 @@ class LogString:
     def __init__(self, short: str, full: str = None, context: str = None,
                  exception: Exception = None, logger_name: str = None):
 
-        logger = logging.getLogger(logger_name) if logger_name else logging.getLogger(os.getenv("LOGGER_NAME", "root"))
-        self.logger = logger
+        self.logger = get_logger(logger_name)
 
         if exception:
             self.exception = exception
@@ -35,10 +43,13 @@ class LogString:
 
     def record(self, level: str) -> None:
         """"Execute" the log message - i.e. send it to the specified logger"""
+        level_number = logging.getLevelName(level.upper())
+        if not self.logger.isEnabledFor(level_number):      # Skip formatting messages that would be discarded
+            return
         context = f"[{self.context}] " if self.context else ""
         log_message = f"{context}{self.full}"
         self.logger.log(
-            level=logging.getLevelName(level.upper()),
+            level=level_number,
             msg=log_message)
 
 
@@ -94,9 +105,9 @@ class NsightClientsRequestBegin(LogString):
 
 class NsightClientsRequestFail(LogString):
     """N-sight api client request failed."""
-    def __init__(self, code: int, reason: str):
+    def __init__(self, connection_error: Exception = None):
         short = "Failed to get N-sight clients."
-        full = f"{short} Code: {code} ({reason})."
+        full = f"{short} Error: {connection_error}. Exiting."
         super().__init__(short, full)
 
 
@@ -163,9 +174,41 @@ class ClientInsertBegin(LogString):
 
 class ClientInsertFail(LogString):
     """Adding client to Halo failed."""
-    def __init__(self, client: str):
+    def __init__(self, client: str, error: Exception = None):
         short = "Failed to add new client to Halo."
-        full = f"{short} Client: {client}."
+        full = f"{short} Client: {client}. Error: {error}"
+        super().__init__(short, full)
+
+
+class ClientBatchInsertFail(LogString):
+    """Adding a batch of clients to Halo failed, clients are posted one by one instead."""
+    def __init__(self, n_clients: int):
+        short = "Failed to add a batch of clients to Halo. Retrying clients one by one."
+        full = f"{short} Clients in batch: {n_clients}."
+        super().__init__(short, full)
+
+
+class ClientInsertRateLimited(LogString):
+    """Halo rate limited a client post request, it's retried after a wait."""
+    def __init__(self, n_clients: int, wait_sec: float):
+        short = "Halo rate limited adding clients. Retrying after a wait."
+        full = f"{short} Clients in request: {n_clients}. Waiting: {wait_sec} seconds."
+        super().__init__(short, full)
+
+
+class ClientInsertUnconfirmed(LogString):
+    """Posting clients to Halo failed, but Halo may have added them anyway (e.g. timeout or server error)."""
+    def __init__(self, n_clients: int, error: Exception = None):
+        short = "Adding clients to Halo failed with an unknown result. Re-reading Halo clients before posting again."
+        full = f"{short} Clients in request: {n_clients}. Error: {error}"
+        super().__init__(short, full)
+
+
+class ClientInsertRecheckFail(LogString):
+    """Re-reading Halo clients after an unconfirmed post failed."""
+    def __init__(self, n_clients: int, error: Exception = None):
+        short = "Failed to re-read Halo clients. Clients from the unconfirmed request are not posted again."
+        full = f"{short} Clients in request: {n_clients}. Error: {error}"
         super().__init__(short, full)
 
 
@@ -245,33 +288,3 @@ class RedactFail(LogString):
         short = f"Failed to redact log entry."
         full = f"{short} Input object: {input_object}. Object type: {type(input_object)}. Value error: {exception}."
         super().__init__(short=short, full=full, exception=exception)
-
-
-# sqlite3.OperationalError
-
-# def sql_read_table_syntax(sql_statement: str) -> str:
-#     return f"Selecting from table by SQL statement: {sql_statement}"
-#
-#
-# def sql_insert_row_syntax(sql_statement: str) -> str:
-#     return f"Inserting row by SQL statement: {sql_statement}"
-#
-#
-# def sql_update_row_syntax(sql_statement: str) -> str:
-#     return f"Updating row by SQL statement: {sql_statement}"
-#
-#
-# def sql_get_table_info(sql_statement: str) -> str:
-#     return f"Getting table info by SQL statement: {sql_statement}"
-#
-#
-# def sql_get_table_row_count(sql_statement: str) -> str:
-#     return f"Getting table row count by SQL statement: {sql_statement}"
-#
-#
-# def sql_nonexisting_table(sql_statement: str) -> str:
-#     return f"Tried to query non-existing table. SQL statement: {sql_statement}"
-#
-#
-# def sql_table_initiation_error():
-#     pass
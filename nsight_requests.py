@@ -1,10 +1,12 @@
 
 # standard
+import io
 import requests
 # external
 import xml.etree.ElementTree as xml_ET      # xml parser
 # local
 import general
+import logstring
 
 
 @general.retry_function(fatal_fail=False)
@@ -14,28 +16,46 @@ def get_clients(url: str, api_key: str) -> requests.Response:
     Queries the RMM API list_clients endpoint and returns the response.
     :param url: N-able API url
     :param api_key: N-able API key
-    :return: requests.Response object
+    :return: requests.Response object or None if request fails
     """
     parameters = {
         "apikey": api_key,
         "service": "list_clients"}
-    response = requests.get(url, params=parameters)
-    response.encoding = "latin_1"
+    response = requests.get(url, params=parameters, timeout=general.request_timeout)
+    if not response.ok:             # Raise error to trigger retry
+        log_entry = logstring.BadResponse(
+            method="GET",
+            url=url,
+            response=response,
+            context="nsight_requests.get_clients")
+        raise ConnectionError(log_entry)
     return response
 
 
 def parse_clients(clients_response: requests.Response) -> list[dict]:
     """
-
-    :param clients_response:
-    :return:
+    Parse N-sight client data from list_clients response xml.
+    Client elements are removed from their parent after reading, so parsed clients don't accumulate in the tree.
+    The response body itself is still held in memory in full.
+    :param clients_response: requests.Response object from get_clients
+    :return: List of dicts with client data
     """
     xml_parse_patterns = {
         "nsight_id": "./clientid",
         "name": "./name"}
 
-    clients_raw = xml_ET.fromstring(clients_response.text).findall("./items/client")
+    # Parse raw bytes, so that the encoding declared in xml is used and a decoded copy of the text isn't created
+    clients_xml = xml_ET.iterparse(io.BytesIO(clients_response.content), events=("start", "end"))
     clients = list()
-    for client_xml in clients_raw:
-        clients += [{name: client_xml.find(pattern).text for name, pattern in xml_parse_patterns.items()}]
+    parents = list()            # Elements open at the current position, to find the parent of a finished client
+    for event, element in clients_xml:
+        if event == "start":
+            parents.append(element)
+            continue
+        parents.pop()
+        if element.tag != "client":
+            continue
+        clients.append({name: element.find(pattern).text for name, pattern in xml_parse_patterns.items()})
+        if parents:
+            parents[-1].remove(element)         # Drop the parsed client from the tree
     return clients
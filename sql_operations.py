@@ -9,13 +9,17 @@ def get_connection(path: str) -> sqlite3.Connection:
     """
     Get SQLite connection to a given database path.
     If database doesn't exist, creates a new database and path directories to it (unless path is :memory:).
+    File databases use write-ahead logging with synchronous=NORMAL.
     :param path: Path to SQLite database
     :return: sqlite3 Connection object to input path
     """
-    if path != ":memory:":
-        if not os.path.exists(os.path.dirname(path)):
-            os.makedirs(os.path.dirname(path))
+    if path != ":memory:" and os.path.dirname(path):       # Database file in current directory has no dirname
+        os.makedirs(os.path.dirname(path), exist_ok=True)
     connection = sqlite3.connect(path)
+    if path != ":memory:":
+        # Write-ahead log: fewer fsyncs per write and readers don't block writers
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
     return connection
 
 
@@ -48,6 +52,12 @@ def get_sql_type(python_type: str) -> str:
     return sql_type_reference.get(python_type, "BLOB")
 
 
+# Patterns for parsing "where"-statements. Compiled once on import, instead of on every parse.
+where_operators_pattern = "|".join(["=", "!=", "<", ">", r"\sin\s"])
+where_column_pattern = re.compile(rf"^.+?(?=({where_operators_pattern}))", re.IGNORECASE)
+where_operator_pattern = re.compile(where_operators_pattern, re.IGNORECASE)
+
+
 def parse_where_parameter(statement: str) -> tuple:
     """
     Take a single SQL-like "where"-statement and parse it to components.
@@ -55,12 +65,9 @@ def parse_where_parameter(statement: str) -> tuple:
     Supported operators: =, !=, <, >, IN
     :return: A tuple with the following values: (column_name, operator, value)
     """
-    operators = ["=", "!=", "<", ">", r"\sin\s"]
-    operators_pattern = '|'.join(operators)
     statement = statement.strip()
 
-    column_pattern = re.compile(rf"^.+?(?=({operators_pattern}))", re.IGNORECASE)
-    column_match = column_pattern.search(statement)
+    column_match = where_column_pattern.search(statement)
     if column_match:
         column = column_match.group(0).strip()
     else:
@@ -68,20 +75,17 @@ def parse_where_parameter(statement: str) -> tuple:
             f"Can't parse the column name from the where statement. "
             f"Problematic statement: '{statement}'")
 
-    operator_pattern = re.compile(operators_pattern, re.IGNORECASE)
-    operator_match = operator_pattern.search(statement)
+    operator_match = where_operator_pattern.search(statement)
     if operator_match:
-        operator_raw = operator_match.group(0)
-        operator = operator_raw.strip()
+        operator = operator_match.group(0).strip()
     else:
         raise ValueError(
             f"Can't parse the operator part from the where statement. "
             f"Problematic statement: '{statement}'")
 
-    value_pattern = re.compile(rf"^.+?{operator_raw}(.+$)", re.IGNORECASE)
-    value_match = value_pattern.search(statement)
-    if value_match:
-        value = value_match.group(1).strip()
+    value = statement[operator_match.end():]        # Everything after the operator
+    if value:
+        value = value.strip()
     else:
         raise ValueError(
             f"Can't parse a searchable value from the where statement. "
@@ -115,7 +119,7 @@ def parse_in_values(value: str) -> list:
     separated_at_comma = [string.strip(r"'\"()") for string in value.split(",")]
     parsed_values = list()
     for string in separated_at_comma:           # Strip whitespaces if the string isn't entirely made of whitespaces.
-        parsed_values += [string.strip(" ") if len(string.strip(" ")) else string]
+        parsed_values.append(string.strip(" ") if len(string.strip(" ")) else string)
     return parsed_values
 
 
@@ -133,11 +137,11 @@ def compile_where_statement(parsed_inputs: list[tuple]) -> tuple[str, list]:
         if statement[1].lower() == "in":
             in_values = [typecast_input_value(value) for value in parse_in_values(statement[2])]
             placeholders = ','.join(["?"] * len(in_values))          # String in the form ?,?,?,...
-            statement_strings += [f"{statement[0]} {statement[1]} ({placeholders})"]
-            values += in_values
+            statement_strings.append(f"{statement[0]} {statement[1]} ({placeholders})")
+            values.extend(in_values)
         else:
-            statement_strings += [f"{statement[0]} {statement[1]} ?"]
-            values += [typecast_input_value(statement[2])]
+            statement_strings.append(f"{statement[0]} {statement[1]} ?")
+            values.append(typecast_input_value(statement[2]))
     where_string = f" WHERE {' AND '.join(statement_strings)}"
     return where_string, values
 
@@ -162,10 +166,7 @@ def read_table(table: str, connection: sqlite3.Connection, where: tuple = None)
     data = response.fetchall()
     # Format the response as a list of dicts
     data_column_names = [item[0] for item in response.description]
-    data_rows = list()
-    for row in data:
-        data_row = {key: value for key, value in zip(data_column_names, row)}
-        data_rows += [data_row]
+    data_rows = [dict(zip(data_column_names, row)) for row in data]
     return data_rows
 
 
@@ -177,11 +178,8 @@ def insert_row(table: str, connection: sqlite3.Connection, **kwargs) -> int:
     :param kwargs: Key-value pairs to insert. In the form of column name: value
     :return: Number of rows inserted (1 or 0)
     """
-    column_names = list()
-    values = tuple()
-    for column_name, value in kwargs.items():
-        column_names += [column_name]
-        values += (value,)
+    column_names = list(kwargs.keys())
+    values = tuple(kwargs.values())
     column_names_string = ",".join(column_names)
     placeholder_string = ", ".join(["?"] * len(column_names))  # As many placeholders as columns. E.g (?, ?, ?, ?)
     sql_statement = f"""
@@ -201,16 +199,14 @@ def update_rows(table: str, connection: sqlite3.Connection, where: tuple = None,
     If no "where"-statement is given, updates all rows
     :param table: Name of the table to update
     :param connection: SQLite connection object
-    :param where: SQL-like "where"-statement. See sql_operations.parse_where_parameter for supported operators
+    :param where: Compiled "where"-statement and its values, e.g. (" WHERE column1 < ?", [99]).
+    See sql_operations.compile_where_statement
     :param kwargs: Key-value pairs to update. In the form of column name: value
     :return: Number of changed rows.
     """
     sql_cursor = connection.cursor()
-    column_assignments = list()
-    column_values = tuple()
-    for column_name, value in kwargs.items():
-        column_assignments += [f"{column_name} = ?"]
-        column_values += (value,)
+    column_assignments = [f"{column_name} = ?" for column_name in kwargs]
+    column_values = tuple(kwargs.values())
     column_assignments_string = ",".join(column_assignments)
 
     placeholder_values = column_values
@@ -223,7 +219,7 @@ def update_rows(table: str, connection: sqlite3.Connection, where: tuple = None,
         where_statement = where[0]
         where_placeholder_values = tuple(where[1])
         placeholder_values += where_placeholder_values
-        sql_statement = sql_statement.replace(";", f"WHERE {where_statement};")
+        sql_statement = sql_statement.replace(";", f"{where_statement};")
 
     sql_cursor.execute(sql_statement, placeholder_values)
     connection.commit()
@@ -1,12 +1,17 @@
 # standard
-from datetime import datetime
-import json
+from concurrent.futures import ThreadPoolExecutor
+import functools
 import logging
 import os
 import re
 import sqlite3
+from time import sleep, time
+# external
+import orjson
+import requests
 # local
 import client_classes
+import config
 import general
 import halo_requests
 import log_operations
@@ -15,299 +20,478 @@ import nsight_requests
 from sql_operations import SqlTableBackup, SqlTableSessions
 
 
-#############################################
-# Environmental / global / config variables #
-#############################################
-
-# Config variables
-ini_file_path = ".ini"
-ini_parameters = general.parse_input_file(ini_file_path)
-
-# Env variables
-env_file_path = ".env"
-general.parse_input_file(
-    env_file_path,
-    parse_values=False,
-    set_environmental_variables=True)
-
-required_env_variables = [
-    "HALO_API_URL",
-    "HALO_API_AUTHENTICATION_URL",
-    "HALO_API_TENANT",
-    "HALO_API_CLIENT_ID",
-    "HALO_API_CLIENT_SECRET",
-    "NSIGHT_BASE_URL",
-    "NSIGHT_API_KEY"]
-
-missing_env_variables = [variable for variable in required_env_variables if os.getenv(variable, None) is None]
-if missing_env_variables:
-    logstring.EnvVariablesMissing(missing_env_variables).record("ERROR")
-    exit(1)
-
-# Global variables
-DRYRUN = bool(int(os.getenv("DRYRUN", 1)))
-SESSION_ID = general.generate_random_hex(8)
-REDACT_FILTER: log_operations.Redactor()
-
-
-#################
-# Setup logging #
-#################
-
-# logging.root.manager.loggerDict has all initialized loggers except root logger
-all_active_loggers = [logger for logger in logging.root.manager.loggerDict.values()
-                      if not isinstance(logger, logging.PlaceHolder)]
-
-# Send all logs to stdout
-log_operations.set_logs_to_stdout(all_active_loggers)
-
-# Set formatter to all logs
-formatter = log_operations.StandardFormatter(
-    indicator=ini_parameters["LOG_STRING_INDICATOR"],
-    session_id=SESSION_ID,
-    dryrun=DRYRUN)
-log_operations.set_formatter(formatter, all_active_loggers)
-
-# Set level
-log_operations.set_level(logging.getLevelName(ini_parameters["LOG_LEVEL"].upper()), all_active_loggers)
-
-# Set log redact filter
-redact_patterns = [
-    re.compile(os.getenv("NSIGHT_API_KEY"), flags=re.IGNORECASE),
-    re.compile(os.getenv("HALO_API_TENANT"), flags=re.IGNORECASE),
-    re.compile(os.getenv("HALO_API_CLIENT_ID"), flags=re.IGNORECASE),
-    re.compile(os.getenv("HALO_API_CLIENT_SECRET"), flags=re.IGNORECASE)]
-
-REDACT_FILTER = log_operations.Redactor(patterns=redact_patterns)      # Used globally to add additional redacted patterns
-
-if bool(int(os.getenv("REDACT_LOGS", 1))):
-    log_operations.set_filter(REDACT_FILTER, all_active_loggers)
-
-
-#############
-# Setup SQL #
-#############
-
-# Use in-memory SQL for dry-run
-sql_database_path = ":memory:" if DRYRUN else ini_parameters["SQL_DATABASE_PATH"]
-
-logstring.SqlSetupBegin(sql_database_path).record("INFO")
-sql_sessions_table = SqlTableSessions(sql_database_path)
-sql_backup_table = SqlTableBackup(sql_database_path)
-
-# Insert session info to SQL
-logstring.SqlInsertSessionInfo(SESSION_ID).record("INFO")
-sql_sessions_table.insert(
-    session_id=SESSION_ID,
-    time_unix=int(datetime.now().timestamp()),
-    status="started")
-
-
-#########################
-# Get Halo client token #
-#########################
-
-# Inputs
-halo_api_authentication_url = os.getenv("HALO_API_AUTHENTICATION_URL")
-halo_api_tenant = os.getenv("HALO_API_TENANT")
-halo_api_client_id = os.getenv("HALO_API_CLIENT_ID")
-halo_api_client_secret = os.getenv("HALO_API_CLIENT_SECRET")
-halo_api_token_scope = "edit:customers"
-
-logstring.HaloTokenRequestBegin().record("INFO")
-halo_authorizer = halo_requests.HaloAuthorizer(         # Uses fatal fail in retry
-    url=halo_api_authentication_url,
-    tenant=halo_api_tenant,
-    client_id=halo_api_client_id,
-    secret=halo_api_client_secret)
-
-halo_client_token = str()
-try:
-    halo_client_token = halo_authorizer.get_token(scope=halo_api_token_scope)["access_token"]
-except ConnectionError as connection_error:
-    logstring.HaloTokenRequestFail(connection_error).record("ERROR")
-    exit(1)
-
-if not halo_client_token:
-    logstring.HaloTokenRequestFail()
-    exit(1)
-
-# Add Halo token to log redact patterns
-halo_client_token_pattern = re.compile(rf"{halo_client_token}")
-REDACT_FILTER.add_pattern(halo_client_token_pattern)
-
-
-#######################
-# Get N-sight clients #
-#######################
-
-# Inputs
-nsight_base_url = os.getenv("NSIGHT_BASE_URL")
-nsight_api_key = os.getenv("NSIGHT_API_KEY")
-
-logstring.NsightClientsRequestBegin().record("INFO")
-nsight_clients_response = nsight_requests.get_clients(          # Uses non-fatal retry
-    url=nsight_base_url,
-    api_key=nsight_api_key)
-
-if nsight_clients_response:
-    nsight_client_data = nsight_requests.parse_clients(nsight_clients_response)
-    nsight_clients = [client_classes.NsightClient(client_data) for client_data in nsight_client_data]
-else:
-    logstring.NsightClientsRequestFail(nsight_clients_response.status_code, nsight_clients_response.reason).record("WARNING")
-    nsight_clients = list()
-
-
-####################
-# Get Halo clients #
-####################
-
-# Inputs
-halo_api_url = os.getenv("HALO_API_URL")
-halo_api_client_endpoint = ini_parameters["HALO_CLIENT_ENDPOINT"]
-halo_api_client_parameters = {"includeinactive": False}
-# halo_client_token (from HaloAuthorizer)
-
-halo_client_session = halo_requests.HaloSession(halo_client_token)
-halo_client_api = halo_requests.HaloInterface(
-    url=halo_api_url,
-    endpoint=halo_api_client_endpoint,
-    fatal_fail=True)             # Abort if a request fails, otherwise missing clients will be incorrectly determined
-
-log.HaloClientRequestBegin().record("INFO")
-halo_client_pages = list()
-try:
-    halo_client_pages = halo_client_api.get(
-        session=halo_client_session,
-        parameters=halo_api_client_parameters)
-except ConnectionError as connection_error:
-    log.HaloClientRequestFail(connection_error).record("ERROR")
-    exit(1)
-if not halo_client_pages:
-    log.HaloClientRequestFail().record("ERROR")
-    exit(1)
-
-halo_client_data = halo_requests.parse_clients(halo_client_pages)
-halo_clients = [client_classes.HaloClient(client_data) for client_data in halo_client_data]
-
-
-########################################
-# Handle N-sight toplevel, if supplied #
-########################################
-
-# Set toplevel id for N-sight clients if toplevel name is provided in .ini, and it exists in Halo
-
-# Inputs
-halo_api_url = os.getenv("HALO_API_URL")
-halo_api_toplevel_endpoint = ini_parameters["HALO_TOPLEVEL_ENDPOINT"]
-halo_api_toplevel_parameters = {"includeinactive": False}
-# halo_client_token (from HaloAuthorizer)
-
-# Get toplevel id for the N-sight clients toplevel name
-nsight_toplevel = str(ini_parameters.get("NSIGHT_CLIENTS_TOPLEVEL", "")).strip()
-if nsight_toplevel:
-    halo_toplevel_session = halo_requests.HaloSession(halo_client_token)
-    halo_toplevel_api = halo_requests.HaloInterface(
-        url=halo_api_url,
-        endpoint=halo_api_toplevel_endpoint,
-        fatal_fail=True)
-
-    log.HaloToplevelRequestBegin().record("INFO")
-    halo_toplevel_pages = list()
+post_rate_limit_retries = 3             # Times a rate limited (429) client post is retried
+post_rate_limit_wait_sec = 10.0         # Wait before retrying a rate limited post, if Halo doesn't send Retry-After
+post_rate_limit_max_wait_sec = 60.0     # Maximum wait before retrying a rate limited post
+post_validation_fail_codes = (400, 422)     # Halo rejected the payload: nothing was added, clients can be posted again
+
+
+def get_retry_after_sec(response: requests.Response) -> float:
+    """
+    Seconds to wait before retrying a rate limited request.
+    :param response: Rate limited (429) response
+    :return: Retry-After header value, if given in seconds. Otherwise the default wait. Capped to the maximum wait.
+    """
+    retry_after = response.headers.get("Retry-After", "").strip()
+    wait_sec = float(retry_after) if retry_after.isdigit() else post_rate_limit_wait_sec
+    return min(wait_sec, post_rate_limit_max_wait_sec)
+
+
+def get_halo_client_keys(client_api: halo_requests.HaloInterface, session: halo_requests.HaloSession,
+                         client_parameters: dict, comparison_variables: list[str]) -> set[tuple[str]]:
+    """
+    Read clients from Halo and return their comparison keys.
+    :param client_api: HaloInterface for the Halo client endpoint
+    :param session: HaloSession object
+    :param client_parameters: Halo client GET request parameters
+    :param comparison_variables: Variables that clients are compared by
+    :return: Set of Halo client comparison keys
+    """
+    halo_client_pages = client_api.get(
+        session=session,
+        parameters=dict(client_parameters))        # Copy, because pagination parameters are added to it
+    return {client_classes.HaloClient(client_data).comparison_key(comparison_variables)
+            for client_data in halo_requests.parse_clients(halo_client_pages)}
+
+
+def post_clients(clients_payloads: list[tuple[client_classes.NsightClient, dict]],
+                 post_api: halo_requests.HaloInterface, client_api: halo_requests.HaloInterface,
+                 session: halo_requests.HaloSession, client_parameters: dict, comparison_variables: list[str],
+                 recheck_halo: bool = True) -> list[bool]:
+    """
+    Post clients to Halo in a single request.
+    Rate limited (429) requests are retried after a wait. Nothing was added, so the same clients are posted again.
+    If Halo rejects the payload (400, 422), clients are posted again one by one.
+    Other rejections (e.g. 401, 403) fail all clients.
+    If the result is unknown (5xx, timeout), Halo clients are re-read and only the missing ones are posted again.
+    :param clients_payloads: List of (client, post payload) tuples
+    :param post_api: HaloInterface to post clients with
+    :param client_api: HaloInterface to re-read Halo clients with
+    :param session: HaloSession object
+    :param client_parameters: Halo client GET request parameters
+    :param comparison_variables: Variables that clients are compared by
+    :param recheck_halo: Re-read Halo clients if the result is unknown. Otherwise, clients are counted as failed.
+    :return: List of True/False for each client, whether it was added to Halo
+    """
+    repost_arguments = {
+        "post_api": post_api,
+        "client_api": client_api,
+        "session": session,
+        "client_parameters": client_parameters,
+        "comparison_variables": comparison_variables}
+
+    client_post_data = [payload for _, payload in clients_payloads]     # Halo accepts a list of clients
+    for rate_limit_retry in range(post_rate_limit_retries + 1):
+        try:
+            post_api.post(
+                session=session,
+                json=client_post_data)
+        except (ConnectionError, requests.RequestException) as post_error:
+            post_fail = post_error          # The except variable is cleared after the block
+        else:
+            return [True] * len(clients_payloads)
+
+        # Status code is None if there was no response (e.g. timeout)
+        status_code = post_fail.response.status_code if isinstance(post_fail, halo_requests.HaloResponseError) else None
+        if status_code != 429 or rate_limit_retry == post_rate_limit_retries:
+            break
+        wait_sec = get_retry_after_sec(post_fail.response)
+        logstring.ClientInsertRateLimited(len(clients_payloads), wait_sec).record("WARNING")
+        sleep(wait_sec)
+
+    # Fall back to posting one by one, so that a single bad client doesn't fail the whole batch
+    if status_code in post_validation_fail_codes and len(clients_payloads) > 1:
+        logstring.ClientBatchInsertFail(len(clients_payloads)).record("WARNING")
+        return [post_clients([client_payload], **repost_arguments, recheck_halo=recheck_halo)[0]
+                for client_payload in clients_payloads]
+
+    # Rejected by Halo, or the result is unknown again after re-reading Halo clients
+    if status_code is not None and status_code < 500 or not recheck_halo:
+        for client, _ in clients_payloads:
+            logstring.ClientInsertFail(client=client.name, error=post_fail).record("WARNING")
+        return [False] * len(clients_payloads)
+
+    # Halo may have added some of the clients before failing, so only the ones still missing are posted again
+    logstring.ClientInsertUnconfirmed(len(clients_payloads), post_fail).record("WARNING")
     try:
-        halo_toplevel_pages = halo_toplevel_api.get(
-            session=halo_toplevel_session,
-            parameters=halo_api_toplevel_parameters)
-    except ConnectionError as connection_error:
-        log.HaloToplevelRequestFail(connection_error).record("ERROR")
-        exit(1)
-    if not halo_toplevel_pages:
-        log.HaloToplevelRequestFail().record("ERROR")
+        halo_client_keys = get_halo_client_keys(client_api, session, client_parameters, comparison_variables)
+    except (ConnectionError, requests.RequestException) as connection_error:
+        logstring.ClientInsertRecheckFail(len(clients_payloads), connection_error).record("WARNING")
+        return [False] * len(clients_payloads)
+
+    clients_added = [client.comparison_key(comparison_variables) in halo_client_keys
+                     for client, _ in clients_payloads]
+    clients_missing = [client_payload for client_payload, added in zip(clients_payloads, clients_added)
+                       if not added]
+    missing_success = iter(post_clients(clients_missing, **repost_arguments, recheck_halo=False)
+                           if clients_missing else [])
+    return [added or next(missing_success) for added in clients_added]
+
+
+def main():
+    """
+    Sync N-sight clients to Halo: add clients that exist in N-sight but not in Halo and back up the changes.
+    """
+    ##############################################
+    # Environmental / session / config variables #
+    ##############################################
+
+    # Config variables
+    ini_parameters = config.get_ini_parameters()
+
+    # Env variables
+    config.load_env_variables()
+
+    required_env_variables = [
+        "HALO_API_URL",
+        "HALO_API_AUTHENTICATION_URL",
+        "HALO_API_TENANT",
+        "HALO_API_CLIENT_ID",
+        "HALO_API_CLIENT_SECRET",
+        "NSIGHT_BASE_URL",
+        "NSIGHT_API_KEY"]
+
+    missing_env_variables = [variable for variable in required_env_variables if os.getenv(variable, None) is None]
+    if missing_env_variables:
+        logstring.EnvVariablesMissing(missing_env_variables).record("ERROR")
         exit(1)
 
-    existing_toplevel_data = halo_requests.parse_toplevels(halo_toplevel_pages)
-    existing_toplevels = [client_classes.HaloToplevel(toplevel_data) for toplevel_data in existing_toplevel_data]
-    nsight_toplevel_match = [toplevel for toplevel in existing_toplevels
-                             if toplevel.name == nsight_toplevel]
+    # Session variables
+    dryrun = bool(int(os.getenv("DRYRUN", 1)))
+    session_id = general.generate_random_hex(8)
 
-    if nsight_toplevel_match:
-        nsight_toplevel_id = nsight_toplevel_match[0].toplevel_id
-        for client in nsight_clients:
-            client.toplevel_id = nsight_toplevel_id
-    else:
-        log.NoMatchingToplevel(nsight_toplevel).record("ERROR")
-        exit(1)
 
-    # Add toplevel_id as a comparison variable for Client class
-    # so that when comparing Clients, only Clients with matching toplevel_id's are counted as equal
-    client_classes.Client.comparison_variables += ["toplevel_id"]
+    #################
+    # Setup logging #
+    #################
+
+    # logging.root.manager.loggerDict has all initialized loggers except root logger
+    all_active_loggers = [logger for logger in logging.root.manager.loggerDict.values()
+                          if not isinstance(logger, logging.PlaceHolder)]
+
+    # Send all logs to stdout
+    log_operations.set_logs_to_stdout(all_active_loggers)
+
+    # Set formatter to all logs
+    formatter = log_operations.StandardFormatter(
+        indicator=ini_parameters["LOG_STRING_INDICATOR"],
+        session_id=session_id,
+        dryrun=dryrun)
+    log_operations.set_formatter(formatter, all_active_loggers)
 
+    # Set level
+    log_operations.set_level(logging.getLevelName(ini_parameters["LOG_LEVEL"].upper()), all_active_loggers)
 
-#################################
-# Get clients missing from Halo #
-#################################
+    # Set log redact filter
+    redact_patterns = [
+        re.compile(os.getenv("NSIGHT_API_KEY"), flags=re.IGNORECASE),
+        re.compile(os.getenv("HALO_API_TENANT"), flags=re.IGNORECASE),
+        re.compile(os.getenv("HALO_API_CLIENT_ID"), flags=re.IGNORECASE),
+        re.compile(os.getenv("HALO_API_CLIENT_SECRET"), flags=re.IGNORECASE)]
 
-clients_not_synced = [client for client in nsight_clients if client not in halo_clients]
-if not clients_not_synced:
-    log.NoMissingClients().record("INFO")
-    exit(0)
+    redact_filter = log_operations.Redactor(patterns=redact_patterns)      # Halo token is added to it later
 
-log.InsertNClients(n_clients=len(clients_not_synced)).record("INFO")
+    if bool(int(os.getenv("REDACT_LOGS", 1))):
+        log_operations.set_filter(redact_filter, all_active_loggers)
 
 
-########################
-# Post missing clients #
-########################
+    #############
+    # Setup SQL #
+    #############
 
-# Inputs
-halo_api_url = os.getenv("HALO_API_URL")
-halo_api_client_endpoint = ini_parameters["HALO_CLIENT_ENDPOINT"]
-# DRYRUN (boolean)
-# halo_client_token (from HaloAuthorizer)
+    # Use in-memory SQL for dry-run
+    sql_database_path = ":memory:" if dryrun else ini_parameters["SQL_DATABASE_PATH"]
 
-halo_client_session = halo_requests.HaloSession(halo_client_token)
-halo_client_api = halo_requests.HaloInterface(
-    url=halo_api_url,
-    endpoint=halo_api_client_endpoint,
-    dryrun=DRYRUN,
-    fatal_fail=False)             # Continue if posting a client fails
+    logstring.SqlSetupBegin(sql_database_path).record("INFO")
+    sql_sessions_table = SqlTableSessions(sql_database_path)
+    sql_backup_table = SqlTableBackup(sql_database_path)
 
-client_post_success = list()
-for client in clients_not_synced:
-    log.ClientInsertBegin(client=client.name).record("INFO")
+    # Insert session info to SQL
+    logstring.SqlInsertSessionInfo(session_id).record("INFO")
+    sql_sessions_table.insert(
+        session_id=session_id,
+        time_unix=int(time()),
+        status="started")
 
-    client_post_data = [client.get_post_payload()]      # Halo accepts dict wrapped in a list
-    response = halo_client_api.post(
-        session=halo_client_session,
-        json=client_post_data)
 
-    client_post_success += [bool(response)]
-    if not response:
-        log.ClientInsertFail(client=client.name).record("WARNING")
+    #########################
+    # Get Halo client token #
+    #########################
 
-log.ClientInsertResult(sum(client_post_success), len(client_post_success) - sum(client_post_success)).record("INFO")
+    # Inputs
+    halo_api_authentication_url = os.getenv("HALO_API_AUTHENTICATION_URL")
+    halo_api_tenant = os.getenv("HALO_API_TENANT")
+    halo_api_client_id = os.getenv("HALO_API_CLIENT_ID")
+    halo_api_client_secret = os.getenv("HALO_API_CLIENT_SECRET")
+    halo_api_token_scope = "edit:customers"
 
+    logstring.HaloTokenRequestBegin().record("INFO")
+    halo_authorizer = halo_requests.HaloAuthorizer(         # Uses fatal fail in retry
+        url=halo_api_authentication_url,
+        tenant=halo_api_tenant,
+        client_id=halo_api_client_id,
+        secret=halo_api_client_secret)
 
-##############################
-# Backup post client actions #
-##############################
+    try:
+        halo_token = halo_authorizer.get_token(scope=halo_api_token_scope)
+    except (ConnectionError, requests.RequestException) as connection_error:     # Timeouts aren't ConnectionErrors
+        logstring.HaloTokenRequestFail(connection_error).record("ERROR")
+        exit(1)
+
+    halo_client_token = halo_token.get("access_token")
+    if not halo_client_token:
+        logstring.HaloTokenRequestFail().record("ERROR")
+        exit(1)
 
-clients_to_backup = [client for client, success in zip(clients_not_synced, client_post_success) if success]
+    # Add Halo token to log redact patterns
+    halo_client_token_pattern = re.compile(rf"{halo_client_token}")
+    redact_filter.add_pattern(halo_client_token_pattern)
 
-for client in clients_to_backup:
-    client_backup_id = general.generate_random_hex(8)
-    log.ClientInsertBackupBegin(client=client.name, backup_id=client_backup_id).record("INFO")
+    # Single session for all Halo API requests, so that the connection is reused
+    halo_session = halo_requests.HaloSession(halo_client_token)
 
-    client_post_data = [client.get_post_payload()]
+
+    #######################
+    # Get N-sight clients #
+    #######################
+
+    # Inputs
+    nsight_base_url = os.getenv("NSIGHT_BASE_URL")
+    nsight_api_key = os.getenv("NSIGHT_API_KEY")
+
+    # Independent requests run in background threads, concurrently with the Halo clients request
+    request_executor = ThreadPoolExecutor(max_workers=2)
     try:
-        n_rows_inserted = sql_backup_table.insert(
-            session_id=SESSION_ID,
-            backup_id=client_backup_id,
-            action="insert",
-            old="",
-            new=json.dumps(client_post_data))
-    except sqlite3.Error as sql_error:
-        log.ClientInsertBackupFail(client=client.name, error=sql_error).record("WARNING")
+        logstring.NsightClientsRequestBegin().record("INFO")
+        # Retry fatally, so that the last error is raised and can be logged with the failure
+        nsight_clients_future = request_executor.submit(
+            general.retry_function(nsight_requests.get_clients.__wrapped__, fatal_fail=True),
+            url=nsight_base_url,
+            api_key=nsight_api_key)
+
+
+        ###############################################
+        # Get Halo toplevels, if N-sight toplevel set #
+        ###############################################
+
+        # Inputs
+        halo_api_url = os.getenv("HALO_API_URL")
+        halo_api_toplevel_endpoint = ini_parameters["HALO_TOPLEVEL_ENDPOINT"]
+        halo_api_toplevel_parameters = {"includeinactive": False}
+        # halo_session (from Get Halo client token)
+        # request_executor (from Get N-sight clients)
+
+        nsight_toplevel = str(ini_parameters.get("NSIGHT_CLIENTS_TOPLEVEL", "")).strip()
+        if nsight_toplevel:
+            halo_toplevel_api = halo_requests.HaloInterface(
+                url=halo_api_url,
+                endpoint=halo_api_toplevel_endpoint,
+                fatal_fail=True)
+
+            logstring.HaloToplevelRequestBegin().record("INFO")
+            halo_toplevel_future = request_executor.submit(
+                halo_toplevel_api.get,
+                session=halo_session,
+                parameters=halo_api_toplevel_parameters)
+
+
+        ####################
+        # Get Halo clients #
+        ####################
+
+        # Inputs
+        # halo_api_url (from Get Halo toplevels)
+        halo_api_client_endpoint = ini_parameters["HALO_CLIENT_ENDPOINT"]
+        halo_api_client_parameters = {"includeinactive": False}
+        # halo_session (from Get Halo client token)
+
+        halo_client_api = halo_requests.HaloInterface(
+            url=halo_api_url,
+            endpoint=halo_api_client_endpoint,
+            fatal_fail=True)     # Abort if a request fails, otherwise missing clients will be incorrectly determined
+
+        logstring.HaloClientRequestBegin().record("INFO")
+        halo_clients = list()
+        n_halo_client_pages = 0
+        try:
+            # Parse pages as they arrive, so that only one raw page is held in memory at a time
+            for halo_client_page in halo_client_api.iter_pages(
+                    session=halo_session,
+                    parameters=halo_api_client_parameters):
+                n_halo_client_pages += 1
+                halo_clients.extend(client_classes.HaloClient(client_data)
+                                    for client_data in halo_requests.parse_clients([halo_client_page]))
+        except (ConnectionError, requests.RequestException) as connection_error:
+            logstring.HaloClientRequestFail(connection_error).record("ERROR")
+            exit(1)
+        if not n_halo_client_pages:
+            logstring.HaloClientRequestFail().record("ERROR")
+            exit(1)
+
+
+        ##########################
+        # Check N-sight response #
+        ##########################
+
+        # Inputs
+        # nsight_clients_future (from Get N-sight clients)
+
+        # Checked only after all Halo client pages are fetched, so that both requests run concurrently
+        # Abort before comparing clients, if there are no N-sight clients to compare against
+        try:
+            nsight_clients_response = nsight_clients_future.result()
+        except (ConnectionError, requests.RequestException) as connection_error:
+            logstring.NsightClientsRequestFail(connection_error).record("ERROR")
+            exit(1)
+
+
+        ########################################
+        # Handle N-sight toplevel, if supplied #
+        ########################################
+
+        # Get toplevel id for N-sight clients if toplevel name is provided in .ini, and it exists in Halo
+
+        # Inputs
+        # nsight_toplevel, halo_toplevel_future (from Get Halo toplevels)
+        # request_executor (from Get N-sight clients)
+
+        # Clients are compared by the Client class comparison variables, unless toplevel_id is added for this run
+        comparison_variables = client_classes.Client.comparison_variables
+
+        if nsight_toplevel:
+            try:
+                halo_toplevel_pages = halo_toplevel_future.result()
+            except (ConnectionError, requests.RequestException) as connection_error:
+                logstring.HaloToplevelRequestFail(connection_error).record("ERROR")
+                exit(1)
+            if not halo_toplevel_pages:
+                logstring.HaloToplevelRequestFail().record("ERROR")
+                exit(1)
+
+            existing_toplevel_data = halo_requests.parse_toplevels(halo_toplevel_pages)
+            existing_toplevels = [client_classes.HaloToplevel(toplevel_data)
+                                  for toplevel_data in existing_toplevel_data]
+            # Toplevels by normalized name. If names are duplicated, the first toplevel is used.
+            halo_toplevel_index = dict()
+            for toplevel in existing_toplevels:
+                halo_toplevel_index.setdefault(client_classes.Client.normalize(toplevel.name), toplevel)
+
+            nsight_toplevel_match = halo_toplevel_index.get(client_classes.Client.normalize(nsight_toplevel))
+            if not nsight_toplevel_match:
+                logstring.NoMatchingToplevel(nsight_toplevel).record("ERROR")
+                exit(1)
+
+            # Add toplevel_id as a comparison variable, so only Clients with matching toplevel_id's are counted as equal
+            # A new list: Client class is left unchanged, so that repeated runs don't keep adding toplevel_id
+            comparison_variables = client_classes.Client.comparison_variables + ["toplevel_id"]
+    finally:
+        # Also runs on exit(): queued requests are cancelled, only requests already running are waited for
+        request_executor.shutdown(cancel_futures=True)
+
+
+    #################################
+    # Get clients missing from Halo #
+    #################################
+
+    # Inputs
+    # nsight_clients_response (from Check N-sight response)
+    # nsight_toplevel, nsight_toplevel_match (from Handle N-sight toplevel)
+    # halo_clients (from Get Halo clients)
+    # comparison_variables (from Handle N-sight toplevel)
+
+    # Halo clients by comparison key, for constant time lookups
+    halo_client_index = {client.comparison_key(comparison_variables): client for client in halo_clients}
+
+    # Create N-sight clients and compare them in a single pass, only the missing ones are kept
+    clients_not_synced = list()
+    for client_data in nsight_requests.parse_clients(nsight_clients_response):
+        client = client_classes.NsightClient(client_data)
+        if nsight_toplevel:
+            client.toplevel_id = nsight_toplevel_match.toplevel_id
+        if client.comparison_key(comparison_variables) not in halo_client_index:
+            clients_not_synced.append(client)
+
+    if not clients_not_synced:
+        logstring.NoMissingClients().record("INFO")
+        exit(0)
+
+    logstring.InsertNClients(n_clients=len(clients_not_synced)).record("INFO")
+
+
+    ########################
+    # Post missing clients #
+    ########################
+
+    # Inputs
+    # halo_api_url, halo_api_client_endpoint (from Get Halo clients)
+    # dryrun (from Environmental / session / config variables)
+    # halo_session (from Get Halo client token)
+    halo_post_max_workers = int(ini_parameters.get("HALO_POST_CONCURRENCY", 8))     # Parallel post requests
+    halo_post_batch_size = int(ini_parameters.get("HALO_POST_BATCH_SIZE", 50))     # Clients per post request
+
+    # Posts aren't idempotent: only retried if the request didn't reach Halo, otherwise clients could be duplicated
+    halo_client_post_api = halo_requests.HaloInterface(
+        url=halo_api_url,
+        endpoint=halo_api_client_endpoint,
+        dryrun=dryrun,
+        retry_exceptions=halo_requests.HaloInterface.unsent_request_exceptions)
+
+    post_client_batch = functools.partial(
+        post_clients,
+        post_api=halo_client_post_api,
+        client_api=halo_client_api,
+        session=halo_session,
+        client_parameters=halo_api_client_parameters,
+        comparison_variables=comparison_variables)
+
+    # Payloads are generated once and reused for backup
+    client_payloads = [(client, client.get_post_payload()) for client in clients_not_synced]
+    client_batches = [client_payloads[i:i + halo_post_batch_size]
+                      for i in range(0, len(client_payloads), halo_post_batch_size)]
+
+    for client in clients_not_synced:
+        logstring.ClientInsertBegin(client=client.name).record("INFO")
+
+    if dryrun:      # Mock posts patch the global mock response registry, so they can't run in parallel
+        batch_post_success = [post_client_batch(batch) for batch in client_batches]
     else:
-        if not n_rows_inserted:
-            log.ClientInsertBackupFail(client=client.name).record("WARNING")
+        with ThreadPoolExecutor(max_workers=halo_post_max_workers) as post_executor:
+            batch_post_success = list(post_executor.map(post_client_batch, client_batches))
+    client_post_success = [success for batch_success in batch_post_success for success in batch_success]
+
+    logstring.ClientInsertResult(sum(client_post_success), len(client_post_success) - sum(client_post_success)).record("INFO")
+
+
+    ##############################
+    # Backup post client actions #
+    ##############################
+
+    # Inputs
+    # client_payloads, client_post_success (from Post missing clients)
+
+    clients_to_backup = [client_payload for client_payload, success in zip(client_payloads, client_post_success)
+                         if success]
+
+    # All backup rows are inserted in a single transaction, committed once the loop finishes
+    with sql_backup_table.connection:
+        for client, client_payload in clients_to_backup:
+            client_backup_id = general.generate_random_hex(8)
+            logstring.ClientInsertBackupBegin(client=client.name, backup_id=client_backup_id).record("INFO")
+
+            client_post_data = [client_payload]
+            try:
+                n_rows_inserted = sql_backup_table.insert(
+                    session_id=session_id,
+                    backup_id=client_backup_id,
+                    action="insert",
+                    old="",
+                    new=orjson.dumps(client_post_data).decode())     # Backup column is TEXT
+            except sqlite3.Error as sql_error:
+                logstring.ClientInsertBackupFail(client=client.name, error=sql_error).record("WARNING")
+            else:
+                if not n_rows_inserted:
+                    logstring.ClientInsertBackupFail(client=client.name).record("WARNING")
+
+
+if __name__ == "__main__":
+    main()
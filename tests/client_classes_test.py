@@ -1,3 +1,6 @@
+# standard
+import pytest
+# local
 import client_classes
 
 
@@ -19,3 +22,48 @@ def test_initialize_toplevel():
     halo_toplevel = client_classes.HaloToplevel({"name": "Test toplevel", "id": 333})
     assert halo_toplevel.name == "Test toplevel"
     assert halo_toplevel.toplevel_id == 333
+
+
+def test_set_membership():
+    nsight_client = client_classes.NsightClient({"name": "Test Client", "nsight_id": 111})
+    halo_clients = {
+        client_classes.HaloClient({"name": "test client", "id": 222, "toplevel_id": ""}),
+        client_classes.HaloClient({"name": "Other client", "id": 223, "toplevel_id": ""})}
+    assert nsight_client in halo_clients
+
+
+def test_equality_normalized():
+    nsight_client = client_classes.NsightClient({"name": " Test client ", "nsight_id": 111})
+    halo_client = client_classes.HaloClient({"name": "TEST CLIENT", "id": 222, "toplevel_id": ""})
+    assert nsight_client == halo_client
+    assert hash(nsight_client) == hash(halo_client)
+
+
+def test_comparison_key():
+    nsight_client = client_classes.NsightClient({"name": " Test Client ", "nsight_id": 111})
+    halo_client = client_classes.HaloClient({"name": "test client", "id": 222, "toplevel_id": ""})
+    assert nsight_client.comparison_key() == halo_client.comparison_key()
+    assert nsight_client.comparison_key()[0] == "test client"
+    assert len(nsight_client.comparison_key()) == len(client_classes.Client.comparison_variables)
+
+
+def test_slots():
+    nsight_client = client_classes.NsightClient({"name": "Test client", "nsight_id": 111})
+    assert not hasattr(nsight_client, "__dict__")
+    assert nsight_client.toplevel_id == ""
+    with pytest.raises(AttributeError):
+        nsight_client.undefined_attribute = 1
+
+
+def test_equality_other_type():
+    nsight_client = client_classes.NsightClient({"name": "Test client", "nsight_id": 111})
+    assert nsight_client != "Test client"
+    assert nsight_client not in [None, 111]
+
+
+def test_comparison_key_variables():
+    nsight_client = client_classes.NsightClient({"name": "Test client", "nsight_id": 111})
+    nsight_client.toplevel_id = 1
+    halo_client = client_classes.HaloClient({"name": "Test client", "id": 222, "toplevel_id": 2})
+    assert nsight_client.comparison_key(["name"]) == halo_client.comparison_key(["name"])
+    assert nsight_client.comparison_key(["name", "toplevel_id"]) != halo_client.comparison_key(["name", "toplevel_id"])
@@ -0,0 +1,28 @@
+# standard
+import os
+# local
+import config
+
+
+def test_get_ini_parameters(tmp_path):
+    ini_path = tmp_path / "test.ini"
+    ini_path.write_text("SINGLE_VALUE = value1\nLIST_VALUE = value1, value2\n")
+
+    ini_parameters = config.get_ini_parameters(str(ini_path))
+    assert ini_parameters["SINGLE_VALUE"] == "value1"
+    assert ini_parameters["LIST_VALUE"] == ["value1", "value2"]
+
+    # Later calls don't re-read the file
+    ini_path.write_text("SINGLE_VALUE = value2\n")
+    assert config.get_ini_parameters(str(ini_path)) is ini_parameters
+
+
+def test_load_env_variables(tmp_path, monkeypatch):
+    env_path = tmp_path / "test.env"
+    env_path.write_text("CONFIG_TEST_VARIABLE = value1, value2\n")
+    monkeypatch.setenv("CONFIG_TEST_VARIABLE", "")        # Restores environment after test
+
+    env_variables = config.load_env_variables(str(env_path))
+    assert env_variables["CONFIG_TEST_VARIABLE"] == "value1, value2"
+    assert os.environ["CONFIG_TEST_VARIABLE"] == "value1, value2"
+    assert config.load_env_variables(str(env_path)) is env_variables
@@ -1,5 +1,6 @@
 # standard
 import logging
+import math
 import pytest
 import re
 import requests
@@ -111,6 +112,45 @@ def test_retry_success(caplog):
     assert log3 in caplog.text
 
 
+def test_retry_time_budget(caplog):
+    attempts = list()
+
+    @general.retry_function(n_retries=5, interval_sec=10, max_total_sec=1, fatal_fail=False)
+    def failing_function():
+        attempts.append(1)
+        raise ConnectionError
+
+    assert failing_function() is None
+    assert len(attempts) == 1           # First retry would have waited past the time budget
+    assert "failed after 1 attempts" in caplog.text
+
+
+def test_retry_backoff_growth(monkeypatch):
+    waits = list()
+    monkeypatch.setattr(general, "sleep", waits.append)
+    monkeypatch.setattr(general.random, "uniform", lambda low, high: high)     # Largest possible jittered delay
+
+    @general.retry_function(n_retries=6, interval_sec=1, max_interval_sec=5, fatal_fail=False)
+    def failing_function():
+        raise ConnectionError
+
+    failing_function()
+    assert waits == [1, 3, 5, 5, 5]
+
+
+def test_retry_backoff_bounds(monkeypatch):
+    waits = list()
+    monkeypatch.setattr(general, "sleep", waits.append)
+
+    @general.retry_function(n_retries=50, interval_sec=1, max_interval_sec=5, fatal_fail=False)
+    def failing_function():
+        raise ConnectionError
+
+    failing_function()
+    assert len(waits) == 49
+    assert all(1 <= wait <= 5 for wait in waits)
+
+
 ##########################
 # Parse input file tests #
 ##########################
@@ -148,6 +188,18 @@ def test_json_value():
     assert parsed_value == json_tuple
 
 
+def test_non_finite_json_value():
+    _, nan_value = general.parse_input_file_line("NAN_VALUE = NaN")
+    assert math.isnan(nan_value)
+    assert general.parse_input_file_line("INFINITY_VALUE = Infinity") == ("INFINITY_VALUE", math.inf)
+    assert general.parse_input_file_line("NEGATIVE_INFINITY = -Infinity") == ("NEGATIVE_INFINITY", -math.inf)
+    assert general.parse_input_file_line("NAME = Nameless") == ("NAME", "Nameless")
+
+def test_value_with_equals_sign():
+    parsed_value = general.parse_input_file_line("API_KEY=abc123==", parse_value=False)
+    assert parsed_value == ("API_KEY", "abc123==")
+
+
 #############################
 # Generate random hex tests #
 #############################
@@ -158,3 +210,9 @@ def random_hex_test():
     assert len(x) == length_x
     for number in x:
         assert number in ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9", "0", "A", "B", "C", "D", "E", "F"]
+
+
+def test_random_hex_odd_length():
+    x = general.generate_random_hex(7)
+    assert len(x) == 7
+    int(x, 16)
@@ -7,6 +7,7 @@ import re
 import requests
 import responses as mock_responses
 # local
+import general
 import halo_requests
 
 
@@ -65,6 +66,39 @@ def test_halo_authorizer_fail():
     mock_responses.stop()
 
 
+def test_halo_authorizer_retry():
+    mock_responses.start()
+    mock_responses.add(
+        method=mock_responses.POST,
+        url=re.compile(r".*?mockurl_auth_retry.*?"),
+        json={},
+        status=503)
+    mock_responses.add(
+        method=mock_responses.POST,
+        url=re.compile(r".*?mockurl_auth_retry.*?"),
+        json={"token_type": "mock_token_type", "access_token": "MOCKTOKENSTRING12345", "expires_in": 111},
+        status=201)
+
+    halo_authorizer = halo_requests.HaloAuthorizer(
+        url="https://mockurl_auth_retry.com",
+        tenant="mock_tenant",
+        client_id="mock_id",
+        secret="mock_secret")
+
+    halo_client_token = halo_authorizer.get_token(scope="edit:customers")
+    assert halo_client_token["access_token"] == "MOCKTOKENSTRING12345"
+
+    mock_responses.stop()
+
+
+def test_jittered_retry():
+    retry_policy = halo_requests.JitteredRetry(total=3, backoff_factor=1)
+    for _ in range(3):
+        retry_policy = retry_policy.increment(method="POST", url="/mock", error=ConnectionError())
+    backoff_time = retry_policy.get_backoff_time()          # Exponential backoff without jitter would be 4 seconds
+    assert 4 <= backoff_time <= 4 * (1 + halo_requests.JitteredRetry.jitter_ratio)
+
+
 # #######################
 # # HaloInterface tests #
 # #######################
@@ -72,6 +106,19 @@ def test_halo_authorizer_fail():
 api_session = halo_requests.HaloSession(token="MOCKTOKENSTRING12345")
 
 
+def test_halo_session_pool():
+    session_adapter = api_session.get_adapter("https://mockurl_session.com")
+    assert session_adapter._pool_maxsize == halo_requests.HaloSession.pool_maxsize
+    assert api_session.headers["Authorization"] == "Bearer MOCKTOKENSTRING12345"
+
+
+def test_api_endpoint_url():
+    api_interface = halo_requests.HaloInterface(
+        url="https://mockurl_endpoint.com/api/",
+        endpoint="/mock_endpoint")
+    assert api_interface.endpoint_url == "https://mockurl_endpoint.com/api/mock_endpoint"
+
+
 def test_api_get():
     api_interface_get = halo_requests.HaloInterface(
         url="https://mockurl_get.com",
@@ -106,7 +153,36 @@ def test_api_get():
     mock_responses.stop()
 
 
-def test_api_get_fail_nonfatal():
+def test_api_iter_pages():
+    api_interface_iter = halo_requests.HaloInterface(
+        url="https://mockurl_iter_pages.com",
+        endpoint="mock_endpoint",
+        fatal_fail=False)
+
+    mock_responses.start()
+    mock_responses.add(
+        method=mock_responses.GET,
+        url=re.compile(r".*?mockurl_iter_pages.*?"),
+        body='{"record_count": 10, "data": {"page": 1}}',
+        status=200)
+    mock_responses.add(
+        method=mock_responses.GET,
+        url=re.compile(r".*?mockurl_iter_pages.*?"),
+        body='{"record_count": 0}',
+        status=200)
+
+    pages = api_interface_iter.iter_pages(
+        session=api_session,
+        parameters={"parameter1": 1})
+
+    assert not isinstance(pages, list)
+    assert [page.json()["data"]["page"] for page in pages] == [1]
+
+    mock_responses.stop()
+
+
+def test_api_get_fail_nonfatal(monkeypatch):
+    monkeypatch.setattr(general, "sleep", lambda _: None)       # Skip waiting between retries
     api_interface_nonfatal = halo_requests.HaloInterface(
         url="https://mockurl_get_fail_nonfatal.com",
         endpoint="mock_endpoint",
@@ -117,7 +193,8 @@ def test_api_get_fail_nonfatal():
         parameters={"parameter1": 1, "parameter2": 2})
 
 
-def test_api_get_fail_fatal():
+def test_api_get_fail_fatal(monkeypatch):
+    monkeypatch.setattr(general, "sleep", lambda _: None)       # Skip waiting between retries
     api_interface_fatal = halo_requests.HaloInterface(
         url="https://mockurl_get_fail_fatal.com",
         endpoint="mock_endpoint",
@@ -148,7 +225,8 @@ def test_api_post():
     mock_responses.stop()
 
 
-def test_api_post_fail():
+def test_api_post_fail(monkeypatch):
+    monkeypatch.setattr(general, "sleep", lambda _: None)       # Skip waiting between retries
     api_interface_post_fail = halo_requests.HaloInterface(
         url="https://mockurl_post_fail.com",
         endpoint="mock_endpoint",
@@ -178,6 +256,30 @@ def test_api_post_fail():
     mock_responses.stop()
 
 
+def test_api_post_server_error_no_retry():
+    api_interface_post_no_retry = halo_requests.HaloInterface(
+        url="https://mockurl_post_no_retry.com",
+        endpoint="mock_endpoint",
+        fatal_fail=True,
+        retry_exceptions=halo_requests.HaloInterface.unsent_request_exceptions)
+
+    mock_responses.start()
+    mock_responses.add(
+        method=mock_responses.POST,
+        url=re.compile(r".*?mockurl_post_no_retry.*?"),
+        status=500)
+
+    n_calls = len(mock_responses.calls)
+    with pytest.raises(halo_requests.HaloResponseError) as response_error:
+        api_interface_post_no_retry.post(
+            session=api_session,
+            json={"value1": 1, "value2": 2})
+    assert response_error.value.response.status_code == 500
+    assert len(mock_responses.calls) == n_calls + 1         # Server errors are not retried
+
+    mock_responses.stop()
+
+
 def test_api_mock_post():
     api_interface_mock_post = halo_requests.HaloInterface(
         url="https://mockurl_mock_post.com",
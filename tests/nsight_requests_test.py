@@ -1,6 +1,7 @@
 # standard
 import re
 # local
+import general
 import nsight_requests
 # external
 import responses as mock_responses
@@ -22,7 +23,8 @@ def test_get_clients():
     mock_responses.stop()
 
 
-def test_get_clients_fail():
+def test_get_clients_fail(monkeypatch):
+    monkeypatch.setattr(general, "sleep", lambda _: None)       # Skip waiting between retries
     response = nsight_requests.get_clients(
         url="https://mockurl_nableapi.com",
         api_key="mock_api_key")
@@ -34,14 +36,14 @@ def test_parse_clients():
     nsight_id1 = "111111"
     name1 = "Mock client 1"
     nsight_id2 = "222222"
-    name2 = "Mock client 2"
+    name2 = "Mock client Jõgeva Ä"       # Non-ASCII, encoded as declared in xml
     nsight_client_mock_xml = f'<?xml version="1.0" encoding="ISO-8859-1"?>\n<result created="2021-04-11T12:24:35+08:00" host="mockapi.nable.com" status="OK"><items>\n<client><name><![CDATA[{name1}]]></name><clientid>{nsight_id1}</clientid><view_dashboard>1</view_dashboard><view_wkstsn_assets>1</view_wkstsn_assets><dashboard_username><![CDATA[admin@mockclient1.com]]></dashboard_username><timezone><![CDATA[USA]]></timezone><creation_date/><server_count>10</server_count><workstation_count>20</workstation_count><mobile_device_count>30</mobile_device_count><device_count>60</device_count></client><client><name><![CDATA[{name2}]]></name><clientid>{nsight_id2}</clientid><view_dashboard>0</view_dashboard><view_wkstsn_assets>0</view_wkstsn_assets><dashboard_username><![CDATA[none]]></dashboard_username><timezone/><creation_date>2020-08-31</creation_date><server_count>1</server_count><workstation_count>2</workstation_count><mobile_device_count>3</mobile_device_count><device_count>6</device_count></client></items></result>\n'
 
     mock_responses.start()
     mock_responses.add(
         method=mock_responses.GET,
         url=re.compile(r"https://mockapi.nable.com"),
-        body=nsight_client_mock_xml,
+        body=nsight_client_mock_xml.encode("latin_1"),
         status=200)
 
     response = nsight_requests.get_clients(
@@ -70,3 +72,21 @@ def test_parse_clients_empty():
     nsight_client_data = nsight_requests.parse_clients(response)
     assert isinstance(nsight_client_data, list)
     assert len(nsight_client_data) == 0
+
+
+def test_get_clients_bad_response(monkeypatch):
+    monkeypatch.setattr(general, "sleep", lambda _: None)       # Skip waiting between retries
+    mock_responses.start()
+    for _ in range(3):
+        mock_responses.add(
+            method=mock_responses.GET,
+            url=re.compile(r"https://mockurl_nableapi_bad_response.com"),
+            body="mock error",
+            status=500)
+
+    response = nsight_requests.get_clients(
+        url="https://mockurl_nableapi_bad_response.com",
+        api_key="mock_api_key")
+
+    assert response is None
+    mock_responses.stop()
@@ -12,6 +12,24 @@ insert_row_dict2 = {"integer_column": 2, "float_column": 3.4}
 insert_row_dict3 = {"text_column": "text3", "integer_column": 1, "float_column": 5.6}
 
 
+def test_get_connection_wal(tmp_path):
+    test_connection = sql_operations.get_connection(str(tmp_path / "test.db"))
+    assert test_connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert test_connection.execute("PRAGMA synchronous").fetchone()[0] == 1       # 1 = NORMAL
+    test_connection.close()
+
+
+def test_get_connection_create_directory(tmp_path, monkeypatch):
+    test_connection = sql_operations.get_connection(str(tmp_path / "new_directory" / "test.db"))
+    test_connection.close()
+    assert (tmp_path / "new_directory" / "test.db").exists()
+
+    monkeypatch.chdir(tmp_path)         # Database without a directory in path
+    test_connection = sql_operations.get_connection("test_no_directory.db")
+    test_connection.close()
+    assert (tmp_path / "test_no_directory.db").exists()
+
+
 def test_create_table():
     test_connection = sqlite3.connect(":memory:")
     sql_operations.create_table("test_table", create_table_dict, test_connection)
@@ -45,7 +63,7 @@ def test_update_rows_single_column():
         table="test_table",
         connection=test_connection,
         text_column="updated_text",
-        where=("integer_column = ?", (1,)))
+        where=(" WHERE integer_column = ?", (1,)))
     assert n_updated_rows == 2
 
     cursor = test_connection.cursor()
@@ -66,7 +84,7 @@ def test_update_rows_multiple_columns():
         connection=test_connection,
         text_column="updated_text2",
         float_column=123.45,
-        where=("integer_column = ?", (1,)))
+        where=(" WHERE integer_column = ?", (1,)))
     assert n_updated_rows == 2
 
     cursor = test_connection.cursor()
@@ -86,7 +104,7 @@ def test_update_rows_null_changed_rows():
         table="test_table",
         connection=test_connection,
         text_column="updated_text",
-        where=("integer_column = ?", (999,)))
+        where=(" WHERE integer_column = ?", (999,)))
     assert n_updated_rows == 0
 
 
@@ -243,3 +261,21 @@ def test_backup_table_update():
     cursor.execute(f"SELECT * FROM {backup_table.table}")
     data = cursor.fetchall()
     assert data == [('ABC123', 'updated_id', 'update', None, "{'new_value': 11111}")]
+
+
+def test_backup_table_update_where():
+    backup_table = sql_operations.SqlTableBackup(":memory:")
+    for backup_id in ["ABC123", "CDE456"]:
+        backup_table.insert(
+            session_id="ABC123",
+            backup_id=backup_id,
+            action="insert",
+            old=None,
+            new="{'new_value': 11111}")
+
+    n_rows_changed = backup_table.update(where="backup_id = CDE456", action="remove")
+    assert n_rows_changed == 1
+
+    cursor = backup_table.connection.cursor()
+    cursor.execute(f"SELECT backup_id, action FROM {backup_table.table}")
+    assert cursor.fetchall() == [("ABC123", "insert"), ("CDE456", "remove")]
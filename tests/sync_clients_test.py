@@ -0,0 +1,237 @@
+# standard
+import json
+import re
+# external
+import requests
+import responses as mock_responses
+# local
+import client_classes
+import general
+import halo_requests
+import sync_clients
+
+
+api_session = halo_requests.HaloSession(token="MOCKTOKENSTRING12345")
+
+
+def get_client_payloads(*names: str) -> list[tuple[client_classes.NsightClient, dict]]:
+    clients = [client_classes.NsightClient({"name": name, "nsight_id": i}) for i, name in enumerate(names)]
+    return [(client, client.get_post_payload()) for client in clients]
+
+
+def add_mock_halo_clients(url: str, halo_clients: list[dict]) -> None:
+    """Mock Halo client GET endpoint. Returns the contents of halo_clients at the time of the request."""
+    def get_callback(request):
+        if "page_no=1" in request.url:
+            return 200, {}, json.dumps({"record_count": len(halo_clients), "clients": halo_clients})
+        return 200, {}, json.dumps({"record_count": 0, "clients": []})
+
+    mock_responses.add_callback(
+        method=mock_responses.GET,
+        url=re.compile(rf"{re.escape(url)}.*"),
+        callback=get_callback)
+
+
+def post_mock_clients(url: str, client_payloads: list[tuple]) -> tuple[list[bool], list[list[str]]]:
+    """Post clients to mock Halo. Returns post success per client and the client names posted in each request."""
+    post_success = sync_clients.post_clients(
+        client_payloads,
+        post_api=halo_requests.HaloInterface(
+            url=url,
+            endpoint="client",
+            retry_exceptions=halo_requests.HaloInterface.unsent_request_exceptions),
+        client_api=halo_requests.HaloInterface(url=url, endpoint="client"),
+        session=api_session,
+        client_parameters={"includeinactive": False},
+        comparison_variables=["name"])
+
+    posted_names = [[client["name"] for client in json.loads(call.request.body)]
+                    for call in mock_responses.calls
+                    if call.request.method == "POST" and call.request.url.startswith(url)]
+    return post_success, posted_names
+
+
+######################
+# post_clients tests #
+######################
+
+def test_post_clients():
+    mock_responses.start()
+    mock_responses.add(
+        method=mock_responses.POST,
+        url=re.compile(r".*?mockurl_post_clients.com.*?"),
+        status=201)
+
+    post_success, posted_names = post_mock_clients(
+        url="https://mockurl_post_clients.com",
+        client_payloads=get_client_payloads("A", "B"))
+
+    assert post_success == [True, True]
+    assert posted_names == [["A", "B"]]
+    mock_responses.stop()
+
+
+def test_post_clients_validation_fail():
+    def post_callback(request):
+        posted_clients = json.loads(request.body)
+        invalid_batch = len(posted_clients) > 1 or posted_clients[0]["name"] == "B"
+        return (422 if invalid_batch else 201), {}, "{}"
+
+    mock_responses.start()
+    mock_responses.add_callback(
+        method=mock_responses.POST,
+        url=re.compile(r".*?mockurl_post_clients_validation.*?"),
+        callback=post_callback)
+
+    post_success, posted_names = post_mock_clients(
+        url="https://mockurl_post_clients_validation.com",
+        client_payloads=get_client_payloads("A", "B", "C"))
+
+    assert post_success == [True, False, True]
+    assert posted_names == [["A", "B", "C"], ["A"], ["B"], ["C"]]
+    mock_responses.stop()
+
+
+def test_post_clients_rate_limited(monkeypatch):
+    waits = list()
+    monkeypatch.setattr(sync_clients, "sleep", waits.append)
+    mock_responses.start()
+    mock_responses.add(
+        method=mock_responses.POST,
+        url=re.compile(r".*?mockurl_post_clients_rate_limited.*?"),
+        headers={"Retry-After": "2"},
+        status=429)
+    mock_responses.add(
+        method=mock_responses.POST,
+        url=re.compile(r".*?mockurl_post_clients_rate_limited.*?"),
+        status=201)
+
+    post_success, posted_names = post_mock_clients(
+        url="https://mockurl_post_clients_rate_limited.com",
+        client_payloads=get_client_payloads("A", "B"))
+
+    assert post_success == [True, True]
+    assert posted_names == [["A", "B"], ["A", "B"]]         # Same batch again, not split
+    assert waits == [2.0]
+    mock_responses.stop()
+
+
+def test_post_clients_rate_limited_fail(monkeypatch):
+    waits = list()
+    monkeypatch.setattr(sync_clients, "sleep", waits.append)
+    mock_responses.start()
+    mock_responses.add(
+        method=mock_responses.POST,
+        url=re.compile(r".*?mockurl_post_clients_rate_limited_fail.*?"),
+        status=429)
+
+    post_success, posted_names = post_mock_clients(
+        url="https://mockurl_post_clients_rate_limited_fail.com",
+        client_payloads=get_client_payloads("A", "B"))
+
+    assert post_success == [False, False]
+    assert posted_names == [["A", "B"]] * (sync_clients.post_rate_limit_retries + 1)
+    assert waits == [sync_clients.post_rate_limit_wait_sec] * sync_clients.post_rate_limit_retries
+    mock_responses.stop()
+
+
+def test_post_clients_unauthorized():
+    mock_responses.start()
+    mock_responses.add(
+        method=mock_responses.POST,
+        url=re.compile(r".*?mockurl_post_clients_unauthorized.*?"),
+        status=401)
+
+    post_success, posted_names = post_mock_clients(
+        url="https://mockurl_post_clients_unauthorized.com",
+        client_payloads=get_client_payloads("A", "B"))
+
+    assert post_success == [False, False]
+    assert posted_names == [["A", "B"]]
+    mock_responses.stop()
+
+
+def test_post_clients_server_error_partially_added():
+    halo_clients = list()
+
+    def post_callback(request):
+        posted_clients = json.loads(request.body)
+        if not halo_clients:            # Halo adds the first client of the first batch, then fails
+            halo_clients.append({"id": 1, "toplevel_id": "", "name": posted_clients[0]["name"]})
+            return 500, {}, "{}"
+        for client in posted_clients:
+            halo_clients.append({"id": len(halo_clients) + 1, "toplevel_id": "", "name": client["name"]})
+        return 201, {}, "{}"
+
+    mock_responses.start()
+    mock_responses.add_callback(
+        method=mock_responses.POST,
+        url=re.compile(r".*?mockurl_post_clients_partial.*?"),
+        callback=post_callback)
+    add_mock_halo_clients("https://mockurl_post_clients_partial.com", halo_clients)
+
+    post_success, posted_names = post_mock_clients(
+        url="https://mockurl_post_clients_partial.com",
+        client_payloads=get_client_payloads("A", "B", "C"))
+
+    assert post_success == [True, True, True]
+    assert posted_names == [["A", "B", "C"], ["B", "C"]]        # Only the clients still missing are posted again
+    assert sorted(client["name"] for client in halo_clients) == ["A", "B", "C"]
+    mock_responses.stop()
+
+
+def test_post_clients_timeout():
+    n_posts = list()
+
+    def post_callback(request):
+        n_posts.append(request)
+        if len(n_posts) == 1:
+            raise requests.ReadTimeout("mock read timeout")
+        return 201, {}, "{}"
+
+    mock_responses.start()
+    mock_responses.add_callback(
+        method=mock_responses.POST,
+        url=re.compile(r".*?mockurl_post_clients_timeout.*?"),
+        callback=post_callback)
+    add_mock_halo_clients("https://mockurl_post_clients_timeout.com", [])
+
+    post_success, _ = post_mock_clients(
+        url="https://mockurl_post_clients_timeout.com",
+        client_payloads=get_client_payloads("A", "B"))
+
+    assert post_success == [True, True]
+    assert len(n_posts) == 2            # Timeout isn't retried, clients are posted again after re-reading Halo
+    mock_responses.stop()
+
+
+def test_post_clients_recheck_fail(monkeypatch):
+    monkeypatch.setattr(general, "sleep", lambda _: None)       # Skip waiting between retries
+    mock_responses.start()
+    mock_responses.add(
+        method=mock_responses.POST,
+        url=re.compile(r".*?mockurl_post_clients_recheck_fail.*?"),
+        status=503)
+    mock_responses.add(
+        method=mock_responses.GET,
+        url=re.compile(r".*?mockurl_post_clients_recheck_fail.*?"),
+        status=503)
+
+    post_success, posted_names = post_mock_clients(
+        url="https://mockurl_post_clients_recheck_fail.com",
+        client_payloads=get_client_payloads("A", "B"))
+
+    assert post_success == [False, False]
+    assert posted_names == [["A", "B"]]         # Not posted again, Halo may have added them
+    mock_responses.stop()
+
+
+def test_get_retry_after_sec():
+    response = requests.Response()
+    assert sync_clients.get_retry_after_sec(response) == sync_clients.post_rate_limit_wait_sec
+    response.headers["Retry-After"] = "5"
+    assert sync_clients.get_retry_after_sec(response) == 5.0
+    response.headers["Retry-After"] = "Wed, 21 Oct 2026 07:28:00 GMT"
+    assert sync_clients.get_retry_after_sec(response) == sync_clients.post_rate_limit_wait_sec
+    response.headers["Retry-After"] = "3600"
+    assert sync_clients.get_retry_after_sec(response) == sync_clients.post_rate_limit_max_wait_sec